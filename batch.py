@@ -0,0 +1,266 @@
+import os
+import json
+import hashlib
+import argparse
+import functools
+import itertools
+
+import generation
+import test_mutihop as evaluation
+from fact_index import update_fact_index
+
+# Batch request lines follow the OpenAI-style batch format, so the exported file
+# can be submitted to an asynchronous batch endpoint as-is or replayed locally
+BATCH_URL = "/v1/chat/completions"
+
+# Stable custom IDs: every item is keyed by combo size and position in
+# itertools.combinations(question_list, size), which never changes when other
+# sizes are generated or evaluated. Generation items are "gen-<size>-<combo>".
+# Evaluation items are "<mode>-<size>-<combo>-<digest>", where the digest
+# fingerprints the question text that was asked, so an answer is never graded
+# against a question regenerated after the export.
+MODES = ["direct", "reasoning"]
+
+def question_digest(question_text):
+    return hashlib.sha256(question_text.encode("utf-8")).hexdigest()[:12]
+
+def generation_custom_id(size, combo_index):
+    return f"gen-{size}-{combo_index}"
+
+def evaluation_custom_id(mode, size, combo_index, question_text):
+    return f"{mode}-{size}-{combo_index}-{question_digest(question_text)}"
+
+# Returns (kind, size, combo_index, digest); digest is None for generation
+# items. Raises ValueError for IDs this module did not write.
+def parse_custom_id(custom_id):
+    parts = str(custom_id).split("-")
+    if len(parts) == (3 if parts[0] == "gen" else 4) and parts[0] in ["gen"] + MODES \
+            and parts[1].isdigit() and parts[2].isdigit():
+        size, combo_index = int(parts[1]), int(parts[2])
+        if combo_index < len(combos_for_size(size)):
+            return parts[0], size, combo_index, parts[3] if len(parts) == 4 else None
+    raise ValueError(f"unrecognised custom_id {custom_id!r}")
+
+@functools.lru_cache(maxsize=None)
+def combos_for_size(size):
+    return list(itertools.combinations(generation.question_list, size))
+
+# Position of each combo in itertools.combinations(question_list, size)
+@functools.lru_cache(maxsize=None)
+def combo_indices(size):
+    return {combo: i for i, combo in enumerate(combos_for_size(size))}
+
+def batch_line(custom_id, prompt, model):
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": BATCH_URL,
+        "body": {
+            "model": model,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+        },
+    }
+
+def load_json(filename, default):
+    try:
+        with open(filename, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+# Function to collect generation prompts for combos without a usable result yet
+def pending_generation_requests(sizes):
+    lines = []
+    for size in sizes:
+        existing = load_json(f"output/multi_hop_{size}_way.json", [])
+        done = {tuple(item["combo"]) for item in existing if "question" in item.get("result", {})}
+
+        for combo_index, combo in enumerate(itertools.combinations(generation.question_list, size)):
+            if combo in done:
+                continue
+            lines.append(batch_line(generation_custom_id(size, combo_index),
+                                    generation.create_prompt(combo), generation.MODEL))
+    return lines
+
+# Function to collect evaluation prompts for questions not yet answered per mode.
+# A question counts as answered when a result exists for the same combo and the
+# same question text, so regenerated questions are asked again.
+def pending_evaluation_requests(modes, sizes):
+    prompt_builders = {
+        "direct": evaluation.create_direct_prompt,
+        "reasoning": evaluation.create_reasoning_prompt,
+    }
+
+    all_questions = evaluation.load_questions(sizes)
+    lines = []
+    for mode in modes:
+        existing = load_json(f"results/{mode}_results.json", [])
+        # Errored calls carry no answer and are worth retrying
+        done = {(tuple(r["sources"]), r["question"]) for r in existing
+                if not str(r["full_response"]).startswith("Error:")}
+
+        for q in all_questions:
+            combo = tuple(q["sources"])
+            if (combo, q["question"]) in done:
+                continue
+            combo_index = combo_indices(q["hop_count"])[combo]
+            lines.append(batch_line(evaluation_custom_id(mode, q["hop_count"], combo_index, q["question"]),
+                                    prompt_builders[mode](q["question"]), evaluation.MODEL))
+    return lines
+
+def export_requests(stage, path, sizes, modes):
+    if stage == "generate":
+        lines = pending_generation_requests(sizes)
+    else:
+        lines = pending_evaluation_requests(modes, sizes)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        for line in lines:
+            f.write(json.dumps(line) + "\n")
+
+    print(f"Wrote {len(lines)} pending {stage} requests to {path}")
+    return lines
+
+# Pull the completion text out of a batch result line; returns (content, error)
+def result_content(line):
+    if line.get("error"):
+        return None, f"Error: {line['error']}"
+
+    response = line.get("response") or {}
+    body = response.get("body", response)
+    try:
+        return body["choices"][0]["message"]["content"], None
+    except (KeyError, IndexError, TypeError):
+        return None, f"Error: malformed batch result {json.dumps(body)[:200]}"
+
+def ingest_generation(items):
+    os.makedirs("output", exist_ok=True)
+
+    for size in sorted(items):
+        combos = combos_for_size(size)
+        filename = f"output/multi_hop_{size}_way.json"
+
+        by_combo = {tuple(item["combo"]): item for item in load_json(filename, [])}
+        for combo_index, (content, error) in items[size].items():
+            combo = combos[combo_index]
+            if error:
+                result = {"error": error, "full_response": "Error occurred during API call"}
+            else:
+                result = generation.extract_question_answer(content)
+            by_combo[combo] = {"combo": list(combo), "result": result}
+
+        # Keep the combination order that process_combinations writes in
+        multi_hop_questions = [by_combo[c] for c in combos if c in by_combo]
+        with open(filename, "w") as f:
+            json.dump(multi_hop_questions, f, indent=2)
+
+        clean_filename, clean_qa_pairs = generation.write_clean_file(size, multi_hop_questions)
+        print(f"Ingested {len(items[size])} {size}-way results; {len(clean_qa_pairs)} clean Q&A pairs in {clean_filename}")
+
+def ingest_evaluation(items):
+    os.makedirs("results", exist_ok=True)
+
+    # Resolve IDs through the combo, against every clean file on disk
+    all_questions = evaluation.load_questions()
+    questions_by_combo = {tuple(q["sources"]): q for q in all_questions}
+    order = {tuple(q["sources"]): i for i, q in enumerate(all_questions)}
+
+    results_by_mode = {}
+    for mode in MODES:
+        filename = f"results/{mode}_results.json"
+        existing = load_json(filename, [])
+        by_combo = {tuple(r["sources"]): r for r in existing}
+        ingested = 0
+
+        for (size, combo_index), (digest, (content, error)) in items.get(mode, {}).items():
+            combo = combos_for_size(size)[combo_index]
+            q = questions_by_combo.get(combo)
+            if q is None:
+                print(f"Warning: no generated question for {mode}-{size}-{combo_index}; skipping")
+                continue
+            if question_digest(q["question"]) != digest:
+                print(f"Warning: {mode}-{size}-{combo_index} answers a question that has since been regenerated; skipping")
+                continue
+            if error:
+                by_combo[combo] = {
+                    "id": None,
+                    "question": q["question"],
+                    "expected_answer": q["answer"],
+                    "model_answer": None,
+                    "full_response": error,
+                    "is_correct": False,
+                    "hop_count": q["hop_count"],
+                    "sources": q.get("sources", [])
+                }
+            else:
+                by_combo[combo] = evaluation.grade_response(q, None, content)
+            ingested += 1
+
+        # Renumber in load_questions order so ids match test_mutihop.py and both
+        # modes agree; results for combos without a current question go last
+        results = sorted(by_combo.values(), key=lambda r: order.get(tuple(r["sources"]), len(order)))
+        for i, r in enumerate(results):
+            r["id"] = order.get(tuple(r["sources"]), len(order) + i)
+        results_by_mode[mode] = results
+
+        if mode in items or existing:
+            with open(filename, "w") as f:
+                json.dump(results, f, indent=2)
+            print(f"Ingested {ingested} {mode} results into {filename}")
+
+    hop_accuracy = evaluation.compute_hop_accuracy(results_by_mode["direct"], results_by_mode["reasoning"])
+    with open("results/hop_accuracy.json", "w") as f:
+        json.dump(hop_accuracy, f, indent=2)
+
+    update_fact_index(results_by_mode, evaluation.MODEL)
+
+def ingest_results(path):
+    generation_items = {}
+    evaluation_items = {}
+    with open(path, "r") as f:
+        for raw in f:
+            if not raw.strip():
+                continue
+            line = json.loads(raw)
+            try:
+                kind, size, combo_index, digest = parse_custom_id(line.get("custom_id"))
+            except ValueError as e:
+                print(f"Warning: skipping batch result with {e}")
+                continue
+            if kind == "gen":
+                generation_items.setdefault(size, {})[combo_index] = result_content(line)
+            else:
+                evaluation_items.setdefault(kind, {})[(size, combo_index)] = (digest, result_content(line))
+
+    if generation_items:
+        ingest_generation(generation_items)
+    if evaluation_items:
+        ingest_evaluation(evaluation_items)
+
+def main():
+    parser = argparse.ArgumentParser(description="Export pending prompts as batch requests, or ingest batch results")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="write pending prompts as JSONL batch requests")
+    export_parser.add_argument("stage", choices=["generate", "evaluate"])
+    export_parser.add_argument("-o", "--output", default="batch/requests.jsonl")
+    export_parser.add_argument("--sizes", type=int, nargs="+", default=[2, 3, 4, 5])
+    export_parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+
+    ingest_parser = subparsers.add_parser("ingest", help="read a batch results JSONL file into output/ and results/")
+    ingest_parser.add_argument("input")
+
+    args = parser.parse_args()
+    if args.command == "export":
+        export_requests(args.stage, args.output, args.sizes, args.modes)
+    else:
+        ingest_results(args.input)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+import os
+import io
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import itertools
+import contextlib
+import statistics
+
+import generation
+import test_mutihop as evaluation
+
+# Micro-benchmarks for the local compute in the pipeline: response parsing,
+# prompt building, grading, question loading and the analysis aggregations.
+# Everything runs on synthetic data, so no API access is needed. Timings only
+# mean something on the machine that recorded them, so the baseline is local:
+# run once with --save-baseline, then later runs are compared against it.
+
+BASELINE_FILE = "benchmarks/baseline.json"
+
+# A median slower than the baseline median by more than this factor, plus the
+# run-to-run spread of both runs, is reported as a regression. Short runs are
+# dominated by timer and scheduler noise, so they get a looser factor.
+REGRESSION_THRESHOLD = 1.2
+SHORT_RUN_THRESHOLD = 1.5
+SHORT_RUN_SECONDS = 0.05
+
+def synthetic_questions(n, seed=0):
+    rng = random.Random(seed)
+    combos = {size: list(itertools.combinations(generation.question_list, size)) for size in [2, 3, 4, 5]}
+    questions = []
+    for i in range(n):
+        size = rng.choice([2, 3, 4, 5])
+        combo = rng.choice(combos[size])
+        questions.append({
+            "question": f"What is the combined value of {' and '.join(q.lower().rstrip('?') for q in combo)}? ({i})",
+            "answer": str(rng.randint(1, 1000)),
+            "sources": list(combo),
+            "hop_count": size
+        })
+    return questions
+
+def synthetic_responses(questions, accuracy, reasoning=False, seed=0):
+    rng = random.Random(seed)
+    responses = []
+    for q in questions:
+        answer = q["answer"] if rng.random() < accuracy else str(rng.randint(1, 1000))
+        if reasoning:
+            steps = "\n".join(f"- Step {s + 1}: look up fact {s + 1} and combine it." for s in range(q["hop_count"]))
+            responses.append(f"Let's solve this step by step.\n{steps}\nSo the final result is {answer}.\n<answer>{answer}</answer>\n")
+        else:
+            responses.append(f"<answer>{answer}</answer>\n")
+    return responses
+
+def synthetic_results(questions, responses):
+    return [evaluation.grade_response(q, i, r) for i, (q, r) in enumerate(zip(questions, responses))]
+
+# Each benchmark gets (rows, data) and returns a zero-argument callable to time.
+# Benchmarks that are super-linear in rows declare a cap so large runs stay usable.
+
+def bench_extract_answers(rows, data):
+    responses = data["reasoning_responses"][:rows]
+    def run():
+        for response in responses:
+            evaluation.extract_answer(response)
+    return run
+
+def bench_extract_question_answer(rows, data):
+    outputs = [f"Reasoning...\n<question>{q['question']}</question>\n<answer>{q['answer']}</answer>\n"
+               for q in data["questions"][:rows]]
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            for output in outputs:
+                generation.extract_question_answer(output)
+    return run
+
+def bench_create_prompt(rows, data):
+    combos = [tuple(q["sources"]) for q in data["questions"][:rows]]
+    def run():
+        for combo in combos:
+            generation.create_prompt(combo)
+    return run
+
+def bench_grade_response(rows, data):
+    pairs = list(zip(data["questions"][:rows], data["reasoning_responses"][:rows]))
+    def run():
+        for i, (q, response) in enumerate(pairs):
+            evaluation.grade_response(q, i, response)
+    return run
+
+def bench_load_questions(rows, data):
+    directory = data["workdir"]
+    def run():
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                evaluation.load_questions()
+        finally:
+            os.chdir(cwd)
+    return run
+
+def bench_compute_hop_accuracy(rows, data):
+    direct, reasoning = data["direct_results"][:rows], data["reasoning_results"][:rows]
+    def run():
+        evaluation.compute_hop_accuracy(direct, reasoning)
+    return run
+
+def bench_hop_statistics(rows, data):
+    from hop_stats import hop_statistics
+    direct, reasoning = data["direct_results"][:rows], data["reasoning_results"][:rows]
+    def run():
+        hop_statistics(direct, reasoning)
+    return run
+
+def bench_fact_index_build(rows, data):
+    from fact_index import FactIndex
+    results = {"direct": data["direct_results"][:rows], "reasoning": data["reasoning_results"][:rows]}
+    def run():
+        FactIndex.from_results(results)
+    return run
+
+def bench_fact_index_queries(rows, data):
+    from fact_index import FactIndex
+    index = FactIndex.from_results({"direct": data["direct_results"][:rows], "reasoning": data["reasoning_results"][:rows]})
+    def run():
+        index.fact_error_rates(mode="direct")
+        index.fact_pair_interactions(mode="reasoning")
+        for hop in [2, 3, 4, 5]:
+            index.breaking_facts(hop)
+    return run
+
+def bench_total_analysis(rows, data):
+    import total_analysis
+    directory = data["workdir"]
+    def run():
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                total_analysis.main(render=False)
+        finally:
+            os.chdir(cwd)
+    return run
+
+# name -> (setup function, row cap or None)
+BENCHMARKS = {
+    "extract_answers": (bench_extract_answers, None),
+    "extract_question_answer": (bench_extract_question_answer, None),
+    "create_prompt": (bench_create_prompt, None),
+    "grade_response": (bench_grade_response, None),
+    "load_questions": (bench_load_questions, None),
+    "compute_hop_accuracy": (bench_compute_hop_accuracy, None),
+    "hop_statistics": (bench_hop_statistics, None),
+    "fact_index_build": (bench_fact_index_build, None),
+    "fact_index_queries": (bench_fact_index_queries, None),
+    # total_analysis filters the DataFrame once per common id, so it is quadratic
+    "total_analysis": (bench_total_analysis, 2000),
+}
+
+# Build the synthetic data set and a scratch directory laid out like the repo
+def prepare_data(rows, workdir):
+    questions = synthetic_questions(rows)
+    direct_responses = synthetic_responses(questions, 0.2, seed=1)
+    reasoning_responses = synthetic_responses(questions, 0.8, reasoning=True, seed=2)
+    data = {
+        "questions": questions,
+        "reasoning_responses": reasoning_responses,
+        "direct_results": synthetic_results(questions, direct_responses),
+        "reasoning_results": synthetic_results(questions, reasoning_responses),
+        "workdir": workdir
+    }
+
+    os.makedirs(os.path.join(workdir, "output"), exist_ok=True)
+    os.makedirs(os.path.join(workdir, "results"), exist_ok=True)
+    for size in [2, 3, 4, 5]:
+        clean = [{k: q[k] for k in ["question", "answer", "sources"]} for q in questions if q["hop_count"] == size]
+        with open(os.path.join(workdir, "output", f"multi_hop_{size}_way_clean.json"), "w") as f:
+            json.dump(clean, f)
+
+    # total_analysis reads the results files; keep them within its row cap
+    cap = BENCHMARKS["total_analysis"][1]
+    for mode in ["direct", "reasoning"]:
+        with open(os.path.join(workdir, "results", f"{mode}_results.json"), "w") as f:
+            json.dump(data[f"{mode}_results"][:cap], f)
+
+    return data
+
+def time_benchmark(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), statistics.median(timings), max(timings) - min(timings)
+
+def run_benchmarks(rows, repeat, names):
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        print(f"Preparing {rows} synthetic rows...")
+        data = prepare_data(rows, workdir)
+
+        for name in names:
+            setup, cap = BENCHMARKS[name]
+            bench_rows = min(rows, cap) if cap else rows
+            fn = setup(bench_rows, data)
+            best, median, spread = time_benchmark(fn, repeat)
+            results[name] = {"rows": bench_rows, "seconds": best, "median_seconds": median, "spread_seconds": spread}
+            print(f"  {name}: {median * 1000:.2f} ms ± {spread * 1000:.2f} ms ({bench_rows} rows)")
+    return results
+
+def load_baseline(path=BASELINE_FILE):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+# Slowest median that still counts as noise for this benchmark
+def regression_limit(result, base):
+    base_median = base.get("median_seconds", base["seconds"])
+    threshold = SHORT_RUN_THRESHOLD if base_median < SHORT_RUN_SECONDS else REGRESSION_THRESHOLD
+    return base_median * threshold + base.get("spread_seconds", 0) + result["spread_seconds"]
+
+def comparison_report(results, baseline):
+    lines = [f"{'benchmark':<26}{'rows':>9}{'baseline ms':>14}{'current ms':>13}{'ratio':>9}  status"]
+    regressions = 0
+    for name, result in results.items():
+        # Baselines are stored per benchmark and row count
+        base = baseline.get(name, {}).get(str(result["rows"]))
+        current_ms = result["median_seconds"] * 1000
+        if not base:
+            lines.append(f"{name:<26}{result['rows']:>9}{'-':>14}{current_ms:>13.2f}{'-':>9}  no baseline")
+            continue
+
+        base_median = base.get("median_seconds", base["seconds"])
+        ratio = result["median_seconds"] / base_median
+        if result["median_seconds"] > regression_limit(result, base):
+            status = "REGRESSION"
+            regressions += 1
+        elif ratio < 1 / REGRESSION_THRESHOLD:
+            status = "faster"
+        else:
+            status = "ok"
+        lines.append(f"{name:<26}{result['rows']:>9}{base_median * 1000:>14.2f}{current_ms:>13.2f}{ratio:>8.2f}x  {status}")
+    return "\n".join(lines), regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parsing, grading and analysis on synthetic results")
+    parser.add_argument("--rows", type=int, default=10000, help="synthetic result rows (e.g. 10000 to 1000000)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--output", help="also write the report to this file")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.rows, args.repeat, args.only)
+
+    baseline = load_baseline(args.baseline)
+    report, regressions = comparison_report(results, baseline)
+    print("\n" + report)
+    if not baseline and not args.save_baseline:
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to record one on this machine")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+
+    if args.save_baseline:
+        for name, result in results.items():
+            baseline.setdefault(name, {})[str(result["rows"])] = {
+                "seconds": result["seconds"],
+                "median_seconds": result["median_seconds"],
+                "spread_seconds": result["spread_seconds"]
+            }
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"\nSaved baseline to {args.baseline}")
+
+    if regressions:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,83 +1,88 @@
 import json
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
-from collections import Counter
 
-# Load the results
-with open("results/direct_results.json", "r") as f:
-    results = json.load(f)
+from hop_stats import accuracy_ci, accuracy_ci_methods
+from fact_index import load_fact_index
+# Results files carry no model name; they come from the evaluation model
+from test_mutihop import MODEL
+from plots import render_figures
+from fact_baseline import load_baseline, select_model, error_breakdown, print_error_breakdown
 
-# Convert to DataFrame for easier analysis
-df = pd.DataFrame(results)
+def main(render=True):
+    # Load the results
+    with open("results/direct_results.json", "r") as f:
+        results = json.load(f)
 
-# Basic statistics
-total_questions = len(df)
-correct_answers = df["is_correct"].sum()
-accuracy = correct_answers / total_questions
+    # Convert to DataFrame for easier analysis
+    df = pd.DataFrame(results)
 
-print(f"Total questions: {total_questions}")
-print(f"Correct answers: {correct_answers}")
-print(f"Overall accuracy: {accuracy:.2%}")
+    # Basic statistics
+    total_questions = len(df)
+    correct_answers = df["is_correct"].sum()
+    accuracy = correct_answers / total_questions
 
-# Accuracy by hop count
-hop_accuracy = df.groupby("hop_count")["is_correct"].agg(["sum", "count"])
-hop_accuracy["accuracy"] = hop_accuracy["sum"] / hop_accuracy["count"]
+    print(f"Total questions: {total_questions}")
+    print(f"Correct answers: {correct_answers}")
+    print(f"Overall accuracy: {accuracy:.2%}")
 
-print("\nAccuracy by hop count:")
-for hop, data in hop_accuracy.iterrows():
-    print(f"{hop}-hop questions: {data['sum']}/{data['count']} = {data['accuracy']:.2%}")
+    # Accuracy by hop count
+    hop_accuracy = df.groupby("hop_count")["is_correct"].agg(["sum", "count"])
+    hop_accuracy["accuracy"] = hop_accuracy["sum"] / hop_accuracy["count"]
+    hop_accuracy["ci_low"], hop_accuracy["ci_high"] = accuracy_ci(hop_accuracy["sum"], hop_accuracy["count"])
+    hop_accuracy["ci_method"] = accuracy_ci_methods(hop_accuracy["sum"], hop_accuracy["count"])
 
-# Analyze error patterns
-# Check for questions where the model gave an answer but was incorrect
-wrong_answers = df[df["is_correct"] == False]
-answered_wrong = wrong_answers[wrong_answers["model_answer"].notnull()]
-no_answer = wrong_answers[wrong_answers["model_answer"].isnull()]
+    print("\nAccuracy by hop count:")
+    for hop, data in hop_accuracy.iterrows():
+        print(f"{hop}-hop questions: {int(data['sum'])}/{int(data['count'])} = {data['accuracy']:.2%} "
+              f"(95% CI {data['ci_low']:.2%}-{data['ci_high']:.2%}, {data['ci_method']})")
 
-print(f"\nQuestions with wrong answers: {len(answered_wrong)}/{total_questions} = {len(answered_wrong)/total_questions:.2%}")
-print(f"Questions with no answers: {len(no_answer)}/{total_questions} = {len(no_answer)/total_questions:.2%}")
+    # Analyze error patterns
+    # Check for questions where the model gave an answer but was incorrect
+    wrong_answers = df[df["is_correct"] == False]
+    answered_wrong = wrong_answers[wrong_answers["model_answer"].notnull()]
+    no_answer = wrong_answers[wrong_answers["model_answer"].isnull()]
 
-# Analyze common sources of errors
-if "sources" in df.columns:
-    # Flatten the list of sources
-    all_sources = [source for sublist in df["sources"].tolist() for source in sublist]
-    source_counts = Counter(all_sources)
-    
-    # Check which sources appear most in incorrect answers
-    incorrect_sources = [source for sublist in wrong_answers["sources"].tolist() for source in sublist]
-    incorrect_source_counts = Counter(incorrect_sources)
-    
-    # Calculate error rate by source
-    source_error_rates = {}
-    for source, count in source_counts.items():
-        incorrect_count = incorrect_source_counts.get(source, 0)
-        source_error_rates[source] = incorrect_count / count
+    print(f"\nQuestions with wrong answers: {len(answered_wrong)}/{total_questions} = {len(answered_wrong)/total_questions:.2%}")
+    print(f"Questions with no answers: {len(no_answer)}/{total_questions} = {len(no_answer)/total_questions:.2%}")
+
+    # Analyze common sources of errors
+    if "sources" in df.columns:
+        # Per-source error rates from the inverted fact index
+        fact_index = load_fact_index({"direct": results}, MODEL)
+        uses, errors, rates = fact_index.fact_error_rates(mode="direct")
     
-    print("\nError rates by source question:")
-    for source, rate in sorted(source_error_rates.items(), key=lambda x: x[1], reverse=True):
-        print(f"{source}: {rate:.2%}")
+        print("\nError rates by source question:")
+        for f in np.argsort(-rates, kind="stable"):
+            if uses[f] > 0:
+                print(f"{fact_index.facts[f]}: {rates[f]:.2%}")
+
+        # Separate errors on unknown facts from errors combining known ones
+        baseline = load_baseline()
+        model = select_model(baseline, fact_index.models)
+        if model:
+            print_error_breakdown(error_breakdown(fact_index, baseline[model], "direct", model), "direct")
 
-# Print some examples of wrong answers
-print("\nExamples of wrong answers:")
-for i, row in answered_wrong.head(5).iterrows():
-    print(f"Question: {row['question']}")
-    print(f"Expected answer: {row['expected_answer']}")
-    print(f"Model answer: {row['model_answer']}")
-    print("---")
+    # Print some examples of wrong answers
+    print("\nExamples of wrong answers:")
+    for i, row in answered_wrong.head(5).iterrows():
+        print(f"Question: {row['question']}")
+        print(f"Expected answer: {row['expected_answer']}")
+        print(f"Model answer: {row['model_answer']}")
+        print("---")
 
-# Visualize results
-plt.figure(figsize=(10, 6))
-bars = plt.bar(hop_accuracy.index, hop_accuracy["accuracy"])
-for i, bar in enumerate(bars):
-    plt.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.02, 
-             f"{hop_accuracy['accuracy'].iloc[i]:.2%}", 
-             ha='center', va='bottom')
+    # Visualize results
+    figures = [("direct_accuracy", {
+        "hops": [int(hop) for hop in hop_accuracy.index],
+        "accuracy": [float(a) for a in hop_accuracy["accuracy"]],
+        "ci_low": [float(a) for a in hop_accuracy["ci_low"]],
+        "ci_high": [float(a) for a in hop_accuracy["ci_high"]]
+    }, "results/direct_accuracy_by_hops.png")]
+    if render:
+        render_figures(figures)
 
-plt.xlabel("Number of Hops")
-plt.ylabel("Accuracy")
-plt.title("Model Accuracy by Number of Hops (Direct Approach)")
-plt.ylim(0, 1.1)
-plt.savefig("results/direct_accuracy_by_hops.png")
-plt.close()
+    print("\nAnalysis complete. Visualization saved to results/direct_accuracy_by_hops.png")
+    return figures
 
-print("\nAnalysis complete. Visualization saved to results/direct_accuracy_by_hops.png")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import os
+import json
+import argparse
+import numpy as np
+
+# Single-hop fact baseline. Each atomic fact is asked on its own, once per
+# model and mode, and cached by (model, fact) in results/fact_baseline.json.
+# Joining it to the multi-hop results through "sources" separates two kinds
+# of failure: recall errors (the model gets at least one of the question's
+# facts wrong on its own) and composition errors (it knows every fact but
+# still gets the multi-hop answer wrong). The baseline costs O(facts) calls per
+# model instead of re-asking facts inside every combo.
+
+BASELINE_FILE = "results/fact_baseline.json"
+
+MODES = ["direct", "reasoning"]
+
+# Single-fact counterparts of the multi-hop prompts in test_mutihop.py; same
+# <answer> format so grading is shared, but without the multi-hop framing
+def create_fact_direct_prompt(question_text):
+    prompt = f"""Answer the following question. Provide ONLY the numerical answer with no explanation.
+Format your response with an XML tag as follows:
+<answer>Your numerical answer here</answer>
+
+Question: "{question_text}"
+"""
+    return prompt
+
+def create_fact_reasoning_prompt(question_text):
+    prompt = f"""Answer the following question. Think it through step-by-step before answering.
+
+Question: "{question_text}"
+
+Once you've determined the answer, format your response by ending with:
+<answer>Your numerical answer here</answer>
+"""
+    return prompt
+
+def load_baseline(path=BASELINE_FILE):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def save_baseline(baseline, path=BASELINE_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2)
+
+def _is_cached(entry):
+    return entry is not None and not str(entry.get("full_response", "")).startswith("Error:")
+
+# Function to evaluate every fact for each model and mode, skipping cached entries
+def run_fact_baseline(models, path=BASELINE_FILE):
+    import generation
+    import test_mutihop as evaluation
+
+    generation.get_api_key()
+    solvers = {
+        "direct": (evaluation.solve_direct, create_fact_direct_prompt),
+        "reasoning": (evaluation.solve_with_reasoning, create_fact_reasoning_prompt),
+    }
+
+    baseline = load_baseline(path)
+    for model in models:
+        model_baseline = baseline.setdefault(model, {})
+        for i, fact in enumerate(generation.question_list):
+            fact_baseline = model_baseline.setdefault(fact, {})
+            for mode in MODES:
+                if _is_cached(fact_baseline.get(mode)):
+                    continue
+
+                question_data = {
+                    "question": fact,
+                    "answer": generation.fact_answers[fact],
+                    "sources": [fact],
+                    "hop_count": 1
+                }
+                solve, create_prompt = solvers[mode]
+                result = solve(question_data, i, model, create_prompt)
+                fact_baseline[mode] = {
+                    "model_answer": result["model_answer"],
+                    "expected_answer": result["expected_answer"],
+                    # No reference answer means recall cannot be judged
+                    "is_correct": result["is_correct"] if result["expected_answer"] is not None else None,
+                    "full_response": result["full_response"]
+                }
+                # Save after every call so an interrupted run keeps what it paid for
+                save_baseline(baseline, path)
+
+        known = {mode: sum(1 for f in model_baseline.values() if f.get(mode, {}).get("is_correct")) for mode in MODES}
+        print(f"{model}: recalled {known['direct']}/{len(model_baseline)} facts directly, "
+              f"{known['reasoning']}/{len(model_baseline)} with reasoning")
+
+    return baseline
+
+# Pick the baseline model matching the results: the first of `models` (the
+# models in the fact index) that has a baseline, or None. A baseline is never
+# applied to another model's results.
+def select_model(baseline, models=()):
+    for model in models:
+        if model in baseline:
+            return model
+    return None
+
+# Split each hop count's errors into recall and composition errors.
+# `index` is a FactIndex over the multi-hop results; `model_baseline` maps
+# fact -> mode -> entry for `model`, and only that model's results are counted. Facts missing from the baseline count
+# as known (as do facts without a reference answer), so their errors are
+# attributed to composition.
+def error_breakdown(index, model_baseline, mode, model):
+    recalled = np.array([model_baseline.get(fact, {}).get(mode, {}).get("is_correct") is not False
+                         for fact in index.facts], dtype=bool)
+
+    # A result has a recall error if any of its facts failed on its own
+    unknown_facts = np.bincount(index.entry_row, weights=~recalled[index.entry_fact],
+                                minlength=len(index.result_id)) > 0
+
+    mask = index.row_mask(mode, model)
+    breakdown = {}
+    for hop in np.unique(index.hop_count[mask]):
+        rows = mask & (index.hop_count == hop)
+        wrong = rows & ~index.is_correct
+        total = int(np.count_nonzero(rows))
+        recall_errors = int(np.count_nonzero(wrong & unknown_facts))
+        composition_errors = int(np.count_nonzero(wrong & ~unknown_facts))
+        breakdown[int(hop)] = {
+            "total": total,
+            "correct": total - recall_errors - composition_errors,
+            "recall_errors": recall_errors,
+            "composition_errors": composition_errors,
+            "recall_error_rate": recall_errors / total if total else 0,
+            "composition_error_rate": composition_errors / total if total else 0,
+            # Questions whose facts were all recalled on their own
+            "all_facts_known": int(np.count_nonzero(rows & ~unknown_facts))
+        }
+    return breakdown
+
+def print_error_breakdown(breakdown, mode):
+    print(f"\n{mode.capitalize()} errors by hop count (recall vs composition):")
+    for hop, data in sorted(breakdown.items()):
+        print(f"{hop}-hop questions ({data['total']} total, {data['all_facts_known']} with all facts known):")
+        print(f"  Recall errors:      {data['recall_errors']}/{data['total']} = {data['recall_error_rate']:.2%}")
+        print(f"  Composition errors: {data['composition_errors']}/{data['total']} = {data['composition_error_rate']:.2%}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate each single fact once per model (cached)")
+    parser.add_argument("--models", nargs="+", help="models to evaluate (defaults to the evaluation model)")
+    args = parser.parse_args()
+
+    if not args.models:
+        import test_mutihop as evaluation
+        args.models = [evaluation.MODEL]
+    run_fact_baseline(args.models)
+
+if __name__ == "__main__":
+    main()
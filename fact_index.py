@@ -0,0 +1,237 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+# Inverted index from each source fact to the results that use it.
+#
+# Results are stored column-wise (one entry per result row: result id, mode,
+# model, hop count, correctness) and the fact membership as a flat list of
+# (row, fact) entries sorted by fact, so the rows touching fact f are
+# fact_rows[fact_indptr[f]:fact_indptr[f + 1]]. Every query below is a
+# bincount or mask over those arrays rather than a Python loop over results.
+
+INDEX_FILE = "results/fact_index.npz"
+
+# Fingerprint of the fields the index is built from, for one mode's results.
+# Stored with the index so a cached index is rebuilt when any result changes,
+# not just when the row count does (e.g. after a regrade or a pull).
+def results_digest(results):
+    digest = hashlib.sha256()
+    for r in results:
+        digest.update(json.dumps([r["id"], r.get("model"), r["hop_count"], bool(r["is_correct"]),
+                                  list(r.get("sources", []))]).encode("utf-8"))
+    return digest.hexdigest()
+
+class FactIndex:
+    def __init__(self, facts, modes, models, result_id, mode, model, hop_count, is_correct, entry_row, entry_fact,
+                 digests=None):
+        self.facts = list(facts)
+        self.modes = list(modes)
+        self.models = list(models)
+        self.fact_ids = {fact: i for i, fact in enumerate(self.facts)}
+
+        self.result_id = result_id
+        self.mode = mode
+        self.model = model
+        self.hop_count = hop_count
+        self.is_correct = is_correct
+        self.entry_row = entry_row
+        self.entry_fact = entry_fact
+        # results_digest of each mode's results, aligned with self.modes
+        self.digests = list(digests) if digests is not None else [None] * len(self.modes)
+
+        # CSR-style inverted lists: rows for each fact, contiguous
+        order = np.argsort(entry_fact, kind="stable")
+        self.fact_rows = entry_row[order]
+        self.fact_indptr = np.concatenate([[0], np.cumsum(np.bincount(entry_fact, minlength=len(self.facts)))])
+
+    @classmethod
+    def from_results(cls, results_by_mode, default_model=None):
+        facts, fact_ids = [], {}
+        models, model_ids = [], {}
+        modes = list(results_by_mode)
+
+        result_id, mode, model, hop_count, is_correct = [], [], [], [], []
+        entry_row, entry_fact = [], []
+
+        for mode_index, mode_name in enumerate(modes):
+            for r in results_by_mode[mode_name]:
+                row = len(result_id)
+                model_name = r.get("model", default_model) or ""
+                if model_name not in model_ids:
+                    model_ids[model_name] = len(models)
+                    models.append(model_name)
+
+                result_id.append(r["id"])
+                mode.append(mode_index)
+                model.append(model_ids[model_name])
+                hop_count.append(r["hop_count"])
+                is_correct.append(bool(r["is_correct"]))
+
+                for source in r.get("sources", []):
+                    if source not in fact_ids:
+                        fact_ids[source] = len(facts)
+                        facts.append(source)
+                    entry_row.append(row)
+                    entry_fact.append(fact_ids[source])
+
+        return cls(facts, modes, models,
+                   np.array(result_id, dtype=np.int64),
+                   np.array(mode, dtype=np.int8),
+                   np.array(model, dtype=np.int32),
+                   np.array(hop_count, dtype=np.int16),
+                   np.array(is_correct, dtype=bool),
+                   np.array(entry_row, dtype=np.int64),
+                   np.array(entry_fact, dtype=np.int32),
+                   [results_digest(results_by_mode[m]) for m in modes])
+
+    def save(self, path=INDEX_FILE):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez_compressed(
+            path,
+            facts=np.array(self.facts, dtype=str),
+            modes=np.array(self.modes, dtype=str),
+            models=np.array(self.models, dtype=str),
+            result_id=self.result_id,
+            mode=self.mode,
+            model=self.model,
+            hop_count=self.hop_count,
+            is_correct=self.is_correct,
+            entry_row=self.entry_row,
+            entry_fact=self.entry_fact,
+            digests=np.array([d or "" for d in self.digests], dtype=str),
+        )
+
+    @classmethod
+    def load(cls, path=INDEX_FILE):
+        with np.load(path) as data:
+            # Indexes saved before digests were stored count as stale
+            digests = data["digests"].tolist() if "digests" in data else None
+            return cls(data["facts"].tolist(), data["modes"].tolist(), data["models"].tolist(),
+                       data["result_id"], data["mode"], data["model"], data["hop_count"],
+                       data["is_correct"], data["entry_row"], data["entry_fact"], digests)
+
+    # Rows of the given fact, optionally restricted by the same filters as row_mask
+    def rows_for_fact(self, fact, mode=None, model=None, hop_count=None):
+        f = self.fact_ids[fact]
+        rows = self.fact_rows[self.fact_indptr[f]:self.fact_indptr[f + 1]]
+        return rows[self.row_mask(mode, model, hop_count)[rows]]
+
+    def row_mask(self, mode=None, model=None, hop_count=None):
+        mask = np.ones(len(self.result_id), dtype=bool)
+        if mode is not None:
+            mask &= self.mode == self.modes.index(mode)
+        if model is not None:
+            mask &= self.model == self.models.index(model)
+        if hop_count is not None:
+            mask &= self.hop_count == hop_count
+        return mask
+
+    # Per-fact (uses, errors, error rate) arrays aligned with self.facts
+    def fact_error_rates(self, mode=None, model=None, hop_count=None):
+        keep = self.row_mask(mode, model, hop_count)[self.entry_row]
+        rows = self.entry_row[keep]
+        facts = self.entry_fact[keep]
+
+        uses = np.bincount(facts, minlength=len(self.facts))
+        errors = np.bincount(facts, weights=~self.is_correct[rows], minlength=len(self.facts))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rates = errors / uses
+        return uses, errors.astype(np.int64), rates
+
+    # Pairwise error rates for facts that co-occur in a question, with the
+    # interaction effect: observed pair error rate minus the additive
+    # expectation baseline + (e_a - baseline) + (e_b - baseline), where
+    # baseline is the error rate of all selected results. The expectation is
+    # clipped to [0, 1] so it stays a valid error rate.
+    # Returns a list of dicts sorted by interaction, largest first.
+    def fact_pair_interactions(self, mode=None, model=None, hop_count=None, min_uses=1):
+        n_facts = len(self.facts)
+        _, _, single_rates = self.fact_error_rates(mode, model, hop_count)
+
+        keep = self.row_mask(mode, model, hop_count)
+        pair_codes, pair_wrong = [], []
+
+        # Entries are written row by row, so rows with k facts form a (rows, k) block
+        facts_per_row = np.bincount(self.entry_row, minlength=len(self.result_id))
+        row_start = np.concatenate([[0], np.cumsum(facts_per_row)])[:-1]
+        for k in np.unique(facts_per_row[keep]):
+            if k < 2:
+                continue
+            rows = np.nonzero(keep & (facts_per_row == k))[0]
+            block = self.entry_fact[row_start[rows][:, None] + np.arange(k)]
+            wrong = ~self.is_correct[rows]
+            for i in range(k):
+                for j in range(i + 1, k):
+                    a = np.minimum(block[:, i], block[:, j])
+                    b = np.maximum(block[:, i], block[:, j])
+                    pair_codes.append(a.astype(np.int64) * n_facts + b)
+                    pair_wrong.append(wrong)
+
+        if not pair_codes:
+            return []
+
+        codes = np.concatenate(pair_codes)
+        wrong = np.concatenate(pair_wrong)
+        unique_codes, inverse = np.unique(codes, return_inverse=True)
+        uses = np.bincount(inverse)
+        errors = np.bincount(inverse, weights=wrong)
+        rates = errors / uses
+
+        a = unique_codes // n_facts
+        b = unique_codes % n_facts
+        baseline = np.count_nonzero(~self.is_correct[keep]) / max(np.count_nonzero(keep), 1)
+        expected = np.clip(single_rates[a] + single_rates[b] - baseline, 0, 1)
+        interaction = rates - expected
+
+        selected = np.nonzero(uses >= min_uses)[0]
+        selected = selected[np.argsort(-interaction[selected], kind="stable")]
+        return [{
+            "facts": [self.facts[a[i]], self.facts[b[i]]],
+            "uses": int(uses[i]),
+            "errors": int(errors[i]),
+            "error_rate": float(rates[i]),
+            "expected_error_rate": float(expected[i]),
+            "interaction": float(interaction[i])
+        } for i in selected]
+
+    # Facts ranked by how much more often questions containing them fail at
+    # k hops than k-hop questions overall (error rate lift), largest first
+    def breaking_facts(self, hop_count, mode="reasoning", model=None, min_uses=1):
+        mask = self.row_mask(mode, model, hop_count)
+        total = np.count_nonzero(mask)
+        if total == 0:
+            return []
+        baseline = np.count_nonzero(~self.is_correct[mask]) / total
+
+        uses, errors, rates = self.fact_error_rates(mode, model, hop_count)
+        selected = np.nonzero(uses >= min_uses)[0]
+        lift = rates[selected] - baseline
+        selected = selected[np.argsort(-lift, kind="stable")]
+        return [{
+            "fact": self.facts[f],
+            "uses": int(uses[f]),
+            "errors": int(errors[f]),
+            "error_rate": float(rates[f]),
+            "lift": float(rates[f] - baseline)
+        } for f in selected]
+
+# Rebuild and persist the index from the results just written
+def update_fact_index(results_by_mode, default_model=None, path=INDEX_FILE):
+    index = FactIndex.from_results(results_by_mode, default_model)
+    index.save(path)
+    return index
+
+# Load the persisted index, building it from the given results if it is missing
+# or stale (a mode absent, or its results differing from the ones passed in)
+def load_fact_index(results_by_mode, default_model=None, path=INDEX_FILE):
+    try:
+        index = FactIndex.load(path)
+    except FileNotFoundError:
+        return FactIndex.from_results(results_by_mode, default_model)
+
+    for mode_name, results in results_by_mode.items():
+        if mode_name not in index.modes or index.digests[index.modes.index(mode_name)] != results_digest(results):
+            return FactIndex.from_results(results_by_mode, default_model)
+    return index
@@ -0,0 +1,174 @@
+import math
+import statistics
+import numpy as np
+
+# Bootstrap confidence intervals and paired significance tests for hop accuracy.
+#
+# Every result is a 0/1 outcome, so resampling n results with replacement only
+# changes how many of them are correct: that count is Binomial(n, p_hat), and
+# for paired direct/reasoning outcomes the four cells (both right, direct only,
+# reasoning only, both wrong) are Multinomial(n, cell proportions). Drawing the
+# counts directly gives the same bootstrap distribution as building an n x R
+# resampling index matrix, in O(R) per hop bucket instead of O(n * R), so 10k
+# resamples over a million results take well under a second.
+#
+# The percentile bootstrap collapses to a zero-width interval when a bucket is
+# all right or all wrong (every resample has the same count), so those buckets
+# get a Wilson score interval instead; each CI records which method produced it.
+
+N_RESAMPLES = 10000
+ALPHA = 0.05
+
+# Threshold on discordant pairs below which McNemar uses the exact binomial test
+MCNEMAR_EXACT_LIMIT = 25
+
+def _rng(seed):
+    return np.random.default_rng(seed)
+
+# Wilson score interval for a binomial proportion, vectorised over buckets
+def wilson_interval(correct, total, alpha=ALPHA):
+    correct = np.atleast_1d(np.asarray(correct, dtype=np.float64))
+    total = np.atleast_1d(np.asarray(total, dtype=np.float64))
+    z = statistics.NormalDist().inv_cdf(1 - alpha / 2)
+
+    safe_total = np.maximum(total, 1)
+    p_hat = correct / safe_total
+    denominator = 1 + z ** 2 / safe_total
+    centre = (p_hat + z ** 2 / (2 * safe_total)) / denominator
+    half_width = z * np.sqrt(p_hat * (1 - p_hat) / safe_total + z ** 2 / (4 * safe_total ** 2)) / denominator
+    return np.clip(centre - half_width, 0, 1), np.clip(centre + half_width, 0, 1)
+
+# Which interval accuracy_ci uses for each bucket: "wilson" when the accuracy
+# is exactly 0 or 1, "bootstrap" otherwise, None for empty buckets
+def accuracy_ci_methods(correct, total):
+    correct = np.atleast_1d(np.asarray(correct, dtype=np.int64))
+    total = np.atleast_1d(np.asarray(total, dtype=np.int64))
+    return [None if t == 0 else "wilson" if c in (0, t) else "bootstrap" for c, t in zip(correct, total)]
+
+# CI for the accuracy of one or more buckets at once: percentile bootstrap,
+# or a Wilson interval for buckets whose accuracy is exactly 0 or 1.
+# `correct` and `total` are scalars or equal-length arrays of per-bucket counts.
+def accuracy_ci(correct, total, n_resamples=N_RESAMPLES, alpha=ALPHA, seed=0):
+    correct = np.atleast_1d(np.asarray(correct, dtype=np.int64))
+    total = np.atleast_1d(np.asarray(total, dtype=np.int64))
+
+    safe_total = np.maximum(total, 1)
+    p_hat = correct / safe_total
+
+    # (buckets, resamples) matrix of resampled correct counts
+    resampled = _rng(seed).binomial(total[:, None], p_hat[:, None], size=(len(total), n_resamples))
+    accuracies = resampled / safe_total[:, None]
+    low, high = np.quantile(accuracies, [alpha / 2, 1 - alpha / 2], axis=1)
+
+    degenerate = (correct == 0) | (correct == total)
+    wilson_low, wilson_high = wilson_interval(correct, total, alpha)
+    low = np.where(degenerate, wilson_low, low)
+    high = np.where(degenerate, wilson_high, high)
+
+    low = np.where(total > 0, low, np.nan)
+    high = np.where(total > 0, high, np.nan)
+    return low, high
+
+# Cell counts for paired outcomes: (both correct, direct only, reasoning only, both wrong)
+def paired_counts(direct_correct, reasoning_correct):
+    direct_correct = np.asarray(direct_correct, dtype=bool)
+    reasoning_correct = np.asarray(reasoning_correct, dtype=bool)
+    both = int(np.count_nonzero(direct_correct & reasoning_correct))
+    direct_only = int(np.count_nonzero(direct_correct & ~reasoning_correct))
+    reasoning_only = int(np.count_nonzero(~direct_correct & reasoning_correct))
+    neither = len(direct_correct) - both - direct_only - reasoning_only
+    return both, direct_only, reasoning_only, neither
+
+# Percentile bootstrap CI for reasoning accuracy minus direct accuracy on paired
+# questions. `cells` is one paired_counts tuple or a (buckets, 4) array of them.
+def bootstrap_delta_ci(cells, n_resamples=N_RESAMPLES, alpha=ALPHA, seed=0):
+    cells = np.atleast_2d(np.asarray(cells, dtype=np.int64))
+    totals = cells.sum(axis=1)
+    rng = _rng(seed)
+
+    low = np.full(len(cells), np.nan)
+    high = np.full(len(cells), np.nan)
+    for i, (row, n) in enumerate(zip(cells, totals)):
+        if n == 0:
+            continue
+        # (resamples, 4) matrix of resampled cell counts; only discordant cells move the delta
+        resampled = rng.multinomial(n, row / n, size=n_resamples)
+        deltas = (resampled[:, 2] - resampled[:, 1]) / n
+        low[i], high[i] = np.quantile(deltas, [alpha / 2, 1 - alpha / 2])
+    return low, high
+
+# McNemar test on the discordant pairs b (direct only) and c (reasoning only).
+# Exact two-sided binomial test for small b + c, continuity-corrected chi-square otherwise.
+def mcnemar_test(b, c):
+    n = b + c
+    if n == 0:
+        return {"statistic": 0.0, "p_value": 1.0, "method": "exact"}
+
+    if n < MCNEMAR_EXACT_LIMIT:
+        tail = sum(math.comb(n, i) for i in range(min(b, c) + 1)) / 2 ** n
+        return {"statistic": float(min(b, c)), "p_value": min(1.0, 2 * tail), "method": "exact"}
+
+    statistic = (abs(b - c) - 1) ** 2 / n
+    # Survival function of chi-square with one degree of freedom
+    p_value = math.erfc(math.sqrt(statistic / 2))
+    return {"statistic": statistic, "p_value": p_value, "method": "chi2"}
+
+# Per-hop CIs for each mode plus the paired direct vs reasoning comparison.
+# Takes result dicts as written to results/*_results.json and returns a dict
+# keyed by hop count that can be merged into hop_accuracy.json.
+def hop_statistics(direct_results, reasoning_results, n_resamples=N_RESAMPLES, alpha=ALPHA, seed=0):
+    hops = sorted(set(r["hop_count"] for r in direct_results) | set(r["hop_count"] for r in reasoning_results))
+
+    mode_stats = {}
+    for mode, results in [("direct", direct_results), ("reasoning", reasoning_results)]:
+        hop_array = np.array([r["hop_count"] for r in results], dtype=np.int64)
+        correct_array = np.array([bool(r["is_correct"]) for r in results], dtype=bool)
+
+        correct = np.array([np.count_nonzero(correct_array[hop_array == h]) for h in hops], dtype=np.int64)
+        total = np.array([np.count_nonzero(hop_array == h) for h in hops], dtype=np.int64)
+        low, high = accuracy_ci(correct, total, n_resamples, alpha, seed)
+        mode_stats[mode] = (low, high, accuracy_ci_methods(correct, total))
+
+    # Pair questions present in both modes by id
+    reasoning_by_id = {r["id"]: r for r in reasoning_results}
+    paired = [(r["hop_count"], bool(r["is_correct"]), bool(reasoning_by_id[r["id"]]["is_correct"]))
+              for r in direct_results if r["id"] in reasoning_by_id]
+    paired_hops = np.array([p[0] for p in paired], dtype=np.int64)
+    paired_direct = np.array([p[1] for p in paired], dtype=bool)
+    paired_reasoning = np.array([p[2] for p in paired], dtype=bool)
+
+    cells = np.array([paired_counts(paired_direct[paired_hops == h], paired_reasoning[paired_hops == h])
+                      for h in hops], dtype=np.int64).reshape(len(hops), 4)
+    delta_low, delta_high = bootstrap_delta_ci(cells, n_resamples, alpha, seed)
+
+    stats = {}
+    for i, hop in enumerate(hops):
+        both, direct_only, reasoning_only, neither = (int(x) for x in cells[i])
+        paired_total = both + direct_only + reasoning_only + neither
+        test = mcnemar_test(direct_only, reasoning_only)
+        stats[int(hop)] = {
+            "direct": _ci_dict(mode_stats["direct"], i),
+            "reasoning": _ci_dict(mode_stats["reasoning"], i),
+            "comparison": {
+                "paired_total": paired_total,
+                "both_correct": both,
+                "direct_only": direct_only,
+                "reasoning_only": reasoning_only,
+                "both_wrong": neither,
+                "delta": (reasoning_only - direct_only) / paired_total if paired_total else None,
+                "delta_ci_low": _float_or_none(delta_low[i]),
+                "delta_ci_high": _float_or_none(delta_high[i]),
+                "mcnemar_statistic": test["statistic"],
+                "mcnemar_p_value": test["p_value"],
+                "mcnemar_method": test["method"],
+                "significant": test["p_value"] < alpha
+            }
+        }
+    return stats
+
+def _float_or_none(value):
+    return None if np.isnan(value) else float(value)
+
+def _ci_dict(bounds, i):
+    low, high, methods = bounds
+    return {"ci_low": _float_or_none(low[i]), "ci_high": _float_or_none(high[i]), "ci_method": methods[i]}
@@ -0,0 +1,86 @@
+import argparse
+
+# Single entry point for the generate -> evaluate -> analyze workflow.
+# Subcommand modules are imported inside their handlers so that help never pays
+# for numpy/pandas/matplotlib. requests and tqdm are only imported by the
+# functions that call the API, so regrade loads just test_mutihop.py and numpy,
+# and offline commands never need OPENROUTER_API_KEY.
+
+def run_generate(args):
+    import generation
+    generation.main(args.sizes)
+
+def run_evaluate(args):
+    import test_mutihop as evaluation
+    if args.self_consistency is not None:
+        evaluation.main_self_consistency(args.self_consistency, args.sizes)
+    else:
+        evaluation.main(args.sizes, args.resume)
+
+def run_analyze(args):
+    import direct_analysis
+    from plots import render_figures
+
+    # Collect every figure first so independent ones render in parallel
+    figures = direct_analysis.main(render=False)
+    if not args.direct_only:
+        import total_analysis
+        figures += total_analysis.main(render=False)
+    render_figures(figures, force=args.force)
+
+def run_baseline(args):
+    import fact_baseline
+    if not args.models:
+        import test_mutihop as evaluation
+        args.models = [evaluation.MODEL]
+    fact_baseline.run_fact_baseline(args.models)
+
+def run_regrade(args):
+    import test_mutihop as evaluation
+    evaluation.regrade_results()
+
+# argparse type for sample counts (also used by test_mutihop.py's own parser)
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {value}")
+    return number
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="multihop", description="Multi-hop language model tests")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = subparsers.add_parser("generate", help="generate multi-hop questions from the fact list")
+    generate_parser.add_argument("--sizes", type=int, nargs="+", default=[2, 3, 4, 5])
+    generate_parser.set_defaults(handler=run_generate)
+
+    evaluate_parser = subparsers.add_parser("evaluate", help="answer generated questions directly and with reasoning")
+    evaluate_parser.add_argument("--sizes", type=int, nargs="+", default=[2, 3, 4, 5])
+    evaluate_parser.add_argument("--self-consistency", type=positive_int, metavar="K",
+                                 help="sample K reasoning completions per question and majority-vote")
+    evaluate_parser.add_argument("--resume", action="store_true",
+                                 help="continue an interrupted run from the results/*_checkpoint.jsonl logs")
+    evaluate_parser.set_defaults(handler=run_evaluate)
+
+    baseline_parser = subparsers.add_parser("baseline", help="ask each single fact once per model (cached) to separate recall from composition errors")
+    baseline_parser.add_argument("--models", nargs="+", help="models to evaluate (defaults to the evaluation model)")
+    baseline_parser.set_defaults(handler=run_baseline)
+
+    analyze_parser = subparsers.add_parser("analyze", help="summarise results and write charts (no API calls)")
+    analyze_parser.add_argument("--direct-only", action="store_true",
+                                help="only analyse results/direct_results.json")
+    analyze_parser.add_argument("--force", action="store_true",
+                                help="re-render figures even if their inputs are unchanged")
+    analyze_parser.set_defaults(handler=run_analyze)
+
+    regrade_parser = subparsers.add_parser("regrade", help="re-grade saved responses without calling the API")
+    regrade_parser.set_defaults(handler=run_regrade)
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.handler(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import os
+import json
+import queue
+import argparse
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from tqdm import tqdm
+
+import generation
+import test_mutihop as evaluation
+from fact_index import update_fact_index
+from records import ResultRecord, ResponseSpill, RecordLog, dump_records
+
+# Run generation and evaluation in one process: every question extracted by
+# generate_multi_hop_question goes straight onto a bounded queue that feeds the
+# direct and reasoning evaluators, so evaluation overlaps generation instead of
+# waiting for every k-way file to finish. The queue bound is the backpressure:
+# generation workers block on put() once evaluators fall behind.
+
+# How often blocked queue operations wake up to check for shutdown
+POLL_SECONDS = 0.5
+
+class Pipeline:
+    def __init__(self, sizes, generate_workers=4, evaluate_workers=4, queue_size=16):
+        self.sizes = sizes
+        self.generate_workers = generate_workers
+        self.evaluate_workers = evaluate_workers
+        self.work_queue = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        # Set on error or Ctrl-C so blocked workers give up instead of hanging
+        self.stop = threading.Event()
+
+        # Results keyed by (size, combo_index) while the run is in flight;
+        # evaluation results are compact ResultRecords with their response
+        # text in spill files and a checkpoint line per graded record
+        self.multi_hop_by_size = {}
+        self.direct_by_key = {}
+        self.reasoning_by_key = {}
+        self.spills = {}
+        self.logs = {}
+
+    # Function to write the generation files for one combo size (call under lock)
+    def save_generation(self, size):
+        done = self.multi_hop_by_size.get(size, {})
+        multi_hop_questions = [done[i] for i in sorted(done)]
+
+        os.makedirs("output", exist_ok=True)
+        with open(f"output/multi_hop_{size}_way.json", "w") as f:
+            json.dump(multi_hop_questions, f, indent=2)
+
+        return generation.write_clean_file(size, multi_hop_questions)
+
+    # Function to write the results files (call under lock). IDs are assigned in
+    # (hop count, combo) order, which is the order load_questions reads the clean
+    # files in, so the files match what test_mutihop.py would have produced.
+    def save_evaluation(self):
+        # Number both modes over the union of keys so the same question shares an id
+        keys = sorted(set(self.direct_by_key) | set(self.reasoning_by_key))
+        id_for_key = {key: i for i, key in enumerate(keys)}
+
+        for results_by_key in [self.direct_by_key, self.reasoning_by_key]:
+            for key, record in results_by_key.items():
+                record.id = id_for_key[key]
+
+        direct_results = [self.direct_by_key[k] for k in sorted(self.direct_by_key)]
+        reasoning_results = [self.reasoning_by_key[k] for k in sorted(self.reasoning_by_key)]
+
+        dump_records(direct_results, "results/direct_results.json")
+        dump_records(reasoning_results, "results/reasoning_results.json")
+
+        return direct_results, reasoning_results
+
+    # Blocking put that gives up once the run is stopping; returns False if it did
+    def put(self, item):
+        while not self.stop.is_set():
+            try:
+                self.work_queue.put(item, timeout=POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    # Function to generate one combo and hand a successful question to the evaluators
+    def generate_item(self, size, combo_index, combo):
+        if self.stop.is_set():
+            return
+        result = generation.generate_multi_hop_question(combo)
+
+        with self.lock:
+            self.multi_hop_by_size.setdefault(size, {})[combo_index] = {
+                "combo": list(combo),
+                "result": result
+            }
+            # Save intermediate results periodically
+            if len(self.multi_hop_by_size[size]) % 5 == 0:
+                self.save_generation(size)
+
+        if "question" in result and "answer" in result:
+            # Blocks while the queue is full, which keeps memory flat
+            self.put(((size, combo_index), {
+                "question": result["question"],
+                "answer": result["answer"],
+                "sources": list(combo),
+                "hop_count": size
+            }))
+
+    # Evaluator loop: pull questions off the queue until the sentinel arrives
+    # or the run is stopped. A crashed evaluator stops the run, so generation
+    # workers do not block forever on a queue nobody drains.
+    def evaluate_worker(self, progress):
+        try:
+            while not self.stop.is_set():
+                try:
+                    item = self.work_queue.get(timeout=POLL_SECONDS)
+                except queue.Empty:
+                    continue
+                if item is None:
+                    break
+                self.evaluate_item(*item)
+                progress.update(1)
+        except BaseException:
+            self.stop.set()
+            raise
+
+    def evaluate_item(self, key, question_data):
+        # The index is provisional; final ids are assigned in save_evaluation
+        index = key[0] * 1000 + key[1]
+        direct_result = evaluation.solve_direct(question_data, index)
+        reasoning_result = evaluation.solve_with_reasoning(question_data, index)
+
+        with self.lock:
+            direct_record = ResultRecord.from_result(direct_result, self.spills["direct"])
+            reasoning_record = ResultRecord.from_result(reasoning_result, self.spills["reasoning"])
+            self.direct_by_key[key] = direct_record
+            self.reasoning_by_key[key] = reasoning_record
+            # Checkpoint every graded record so a failed run keeps its answers
+            self.logs["direct"].append(direct_record)
+            self.logs["reasoning"].append(reasoning_record)
+
+    def run(self):
+        generation.get_api_key()
+
+        os.makedirs("results", exist_ok=True)
+        for mode in ["direct", "reasoning"]:
+            self.spills[mode] = ResponseSpill(f"results/{mode}_responses.jsonl")
+            self.logs[mode] = RecordLog(f"results/{mode}_checkpoint.jsonl", self.spills[mode])
+
+        jobs = [(size, combo_index, combo)
+                for size in self.sizes
+                for combo_index, combo in enumerate(itertools.combinations(generation.question_list, size))]
+        print(f"Pipelining {len(jobs)} combos across sizes {self.sizes}")
+
+        progress = tqdm(desc="evaluated")
+        # Daemon threads so a hung request cannot keep the process alive on exit
+        evaluators = [threading.Thread(target=self.evaluate_worker, args=(progress,), daemon=True)
+                      for _ in range(self.evaluate_workers)]
+        for t in evaluators:
+            t.start()
+
+        executor = ThreadPoolExecutor(max_workers=self.generate_workers)
+        finished = False
+        try:
+            futures = [executor.submit(self.generate_item, size, combo_index, combo)
+                       for size, combo_index, combo in jobs]
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"Error processing combo: {str(e)}")
+            finished = True
+        finally:
+            # On error or Ctrl-C, unblock every worker before waiting for them
+            if not finished:
+                self.stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+            # Write the final per-size files, complete or not
+            with self.lock:
+                for size in self.sizes:
+                    clean_filename, clean_qa_pairs = self.save_generation(size)
+                    print(f"Saved {len(clean_qa_pairs)} clean Q&A pairs to {clean_filename}")
+
+            for _ in evaluators:
+                self.put(None)
+            # Evaluators must be done with the spills before they are closed
+            for t in evaluators:
+                t.join()
+            progress.close()
+
+            with self.lock:
+                direct_results, reasoning_results = self.save_evaluation()
+            for closable in list(self.logs.values()) + list(self.spills.values()):
+                closable.close()
+
+        hop_accuracy = evaluation.compute_hop_accuracy(direct_results, reasoning_results)
+        with open("results/hop_accuracy.json", "w") as f:
+            json.dump(hop_accuracy, f, indent=2)
+
+        update_fact_index({"direct": direct_results, "reasoning": reasoning_results}, evaluation.MODEL)
+
+        evaluation.print_hop_accuracy(hop_accuracy)
+
+def run_pipeline(sizes, generate_workers=4, evaluate_workers=4, queue_size=16):
+    Pipeline(sizes, generate_workers, evaluate_workers, queue_size).run()
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate and evaluate multi-hop questions in one streaming pass")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2, 3, 4, 5])
+    parser.add_argument("--generate-workers", type=int, default=4)
+    parser.add_argument("--evaluate-workers", type=int, default=4)
+    parser.add_argument("--queue-size", type=int, default=16,
+                        help="maximum questions waiting for evaluation before generation blocks")
+    args = parser.parse_args()
+
+    run_pipeline(args.sizes, args.generate_workers, args.evaluate_workers, args.queue_size)
+
+if __name__ == "__main__":
+    main()
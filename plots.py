@@ -0,0 +1,190 @@
+import os
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+# Figure rendering stage. Each figure is described by a renderer name, the
+# output path and the JSON-serialisable aggregates it is drawn from. A figure is
+# only re-rendered when the hash of (renderer, aggregates) differs from the one
+# recorded for its path, and figures that do need rendering are drawn in a
+# process pool since each one is independent and CPU bound at dpi=300.
+
+CACHE_FILE = ".plot_cache.json"
+
+# Bump when a renderer's drawing code changes so cached figures are redrawn
+RENDERER_VERSION = 1
+
+def _pyplot():
+    import matplotlib
+    matplotlib.use("Agg")  # Render to files only; never open a window
+    import matplotlib.pyplot as plt
+    return plt
+
+def _annotate_bars(plt, bars, fontsize=8, skip_zero=True, labels=None):
+    for i, bar in enumerate(bars):
+        height = bar.get_height()
+        if skip_zero and height <= 0:
+            continue
+        plt.annotate(labels[i] if labels else f'{height:.2f}',
+                     xy=(bar.get_x() + bar.get_width() / 2, height),
+                     xytext=(0, 3 if height >= 0 else -12),
+                     textcoords="offset points",
+                     ha='center', va='bottom' if height >= 0 else 'top',
+                     fontsize=fontsize)
+
+# Accuracy by hop count for one mode, with bootstrap CI error bars
+def render_direct_accuracy(data, path):
+    plt = _pyplot()
+
+    plt.figure(figsize=(10, 6))
+    accuracy = data["accuracy"]
+    bars = plt.bar(data["hops"], accuracy,
+                   yerr=[[a - low for a, low in zip(accuracy, data["ci_low"])],
+                         [high - a for a, high in zip(accuracy, data["ci_high"])]],
+                   capsize=4)
+    for i, bar in enumerate(bars):
+        plt.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.02,
+                 f"{accuracy[i]:.2%}",
+                 ha='center', va='bottom')
+
+    plt.xlabel("Number of Hops")
+    plt.ylabel("Accuracy")
+    plt.title(data.get("title", "Model Accuracy by Number of Hops (Direct Approach)"))
+    plt.ylim(0, 1.1)
+    plt.savefig(path)
+    plt.close()
+
+# Four-panel direct vs reasoning comparison; panels with no data are skipped
+def render_comparison(data, path):
+    import numpy as np
+    plt = _pyplot()
+
+    plt.style.use('ggplot')
+    plt.figure(figsize=(12, 10))
+
+    # 1. Bar chart comparing accuracy by hop count
+    accuracy = data.get("accuracy")
+    if accuracy:
+        plt.subplot(2, 2, 1)
+
+        x = np.arange(len(accuracy["hops"]))
+        width = 0.35
+
+        bars1 = plt.bar(x - width/2, accuracy["direct"], width, label='Direct',
+                        yerr=accuracy["direct_errors"], capsize=3)
+        bars2 = plt.bar(x + width/2, accuracy["reasoning"], width, label='Reasoning',
+                        yerr=accuracy["reasoning_errors"], capsize=3)
+
+        plt.xlabel('Hop Count')
+        plt.ylabel('Accuracy')
+        plt.title('Accuracy by Hop Count')
+        plt.xticks(x, accuracy["hops"])
+        plt.ylim(0, 1.0)
+        plt.legend()
+
+        _annotate_bars(plt, bars1)
+        _annotate_bars(plt, bars2)
+
+    # 2. Performance difference, starred where McNemar p < 0.05
+    delta = data.get("delta")
+    if delta:
+        plt.subplot(2, 2, 2)
+
+        x = np.arange(len(delta["hops"]))
+        colors = ['green' if d > 0 else 'red' for d in delta["deltas"]]
+        bars = plt.bar(x, delta["deltas"], color=colors, yerr=delta["errors"], capsize=3)
+
+        plt.axhline(y=0, color='black', linestyle='-', alpha=0.3)
+        plt.xlabel('Hop Count')
+        plt.ylabel('Accuracy Difference (Reasoning - Direct)')
+        plt.title('Performance Difference by Hop Count')
+        plt.xticks(x, delta["hops"])
+
+        labels = [f'{d:.2f}{"*" if significant else ""}' for d, significant in zip(delta["deltas"], delta["significant"])]
+        _annotate_bars(plt, bars, fontsize=9, skip_zero=False, labels=labels)
+
+    # 3. Differing outcomes analysis
+    differences = data.get("differences")
+    if differences:
+        plt.subplot(2, 2, 3)
+
+        x = np.arange(len(differences["hops"]))
+        width = 0.35
+
+        plt.bar(x - width/2, differences["direct_better"], width, label='Direct Better')
+        plt.bar(x + width/2, differences["reasoning_better"], width, label='Reasoning Better')
+
+        plt.xlabel('Hop Count')
+        plt.ylabel('Number of Questions')
+        plt.title('Questions with Different Outcomes by Hop Count')
+        plt.xticks(x, differences["hops"])
+        plt.legend()
+
+    # 4. Overall performance comparison pie chart
+    outcomes = data.get("outcomes")
+    if outcomes:
+        plt.subplot(2, 2, 4)
+
+        labels = ['Both Correct', 'Both Wrong', 'Only Direct Correct', 'Only Reasoning Correct']
+        colors = ['forestgreen', 'lightcoral', 'royalblue', 'gold']
+
+        plt.pie(outcomes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
+        plt.axis('equal')
+        plt.title('Question Outcome Distribution')
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=300)
+    plt.close()
+
+RENDERERS = {
+    "direct_accuracy": render_direct_accuracy,
+    "comparison": render_comparison,
+}
+
+def figure_hash(renderer, data):
+    payload = json.dumps({"renderer": renderer, "version": RENDERER_VERSION, "data": data}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _render(renderer, data, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    RENDERERS[renderer](data, path)
+    return path
+
+def _load_cache(cache_file):
+    try:
+        with open(cache_file, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+# Render every (renderer, data, path) figure whose inputs changed since the
+# last run. Returns the list of paths that were actually rendered.
+def render_figures(figures, cache_file=CACHE_FILE, workers=None, force=False):
+    cache = _load_cache(cache_file)
+
+    pending = []
+    for renderer, data, path in figures:
+        digest = figure_hash(renderer, data)
+        if not force and cache.get(path) == digest and os.path.exists(path):
+            print(f"Unchanged, skipping {path}")
+            continue
+        pending.append((renderer, data, path, digest))
+
+    if len(pending) == 1 or workers == 1:
+        for renderer, data, path, _ in pending:
+            _render(renderer, data, path)
+    elif pending:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_render, renderer, data, path) for renderer, data, path, _ in pending]
+            for future in futures:
+                future.result()
+
+    for _, _, path, digest in pending:
+        cache[path] = digest
+        print(f"Rendered {path}")
+
+    if pending:
+        with open(cache_file, "w") as f:
+            json.dump(cache, f, indent=2, sort_keys=True)
+
+    return [path for _, _, path, _ in pending]
@@ -0,0 +1,153 @@
+import os
+import sys
+import json
+import textwrap
+
+# Compact in-memory result records. Evaluation used to hold one 9-key dict per
+# question, including the full model response, until the end of the run. A
+# ResultRecord keeps only the scalar fields in __slots__, shares one interned
+# tuple per distinct source combination, and leaves the response text in an
+# append-only spill file, remembering just its byte offset. Records still read
+# like the old dicts (record["is_correct"], record.get("sources")), so the
+# aggregation code works on either.
+
+FIELDS = ["id", "question", "expected_answer", "model_answer", "full_response", "is_correct", "hop_count", "sources"]
+
+_interned_sources = {}
+
+def intern_sources(sources):
+    key = tuple(sys.intern(s) for s in sources)
+    return _interned_sources.setdefault(key, key)
+
+# Append-only JSONL file of response texts, addressed by byte offset. A new
+# run truncates it; with resume=True the existing responses are kept so
+# offsets recorded in a RecordLog stay valid.
+class ResponseSpill:
+    def __init__(self, path, resume=False):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.file = open(path, "a+b" if resume else "w+b")
+
+    def write(self, text):
+        self.file.seek(0, os.SEEK_END)
+        offset = self.file.tell()
+        self.file.write(json.dumps(text).encode("utf-8") + b"\n")
+        # Flush before any RecordLog line can point at this offset
+        self.file.flush()
+        return offset
+
+    def read(self, offset):
+        self.file.flush()
+        self.file.seek(offset)
+        return json.loads(self.file.readline())
+
+    def close(self):
+        self.file.close()
+
+class ResultRecord:
+    __slots__ = ["id", "question", "expected_answer", "model_answer", "response_offset",
+                 "is_correct", "hop_count", "sources", "spill"]
+
+    def __init__(self, id, question, expected_answer, model_answer, response_offset, is_correct, hop_count, sources, spill):
+        self.id = id
+        self.question = question
+        self.expected_answer = expected_answer
+        self.model_answer = model_answer
+        self.response_offset = response_offset
+        self.is_correct = is_correct
+        self.hop_count = hop_count
+        self.sources = sources
+        self.spill = spill
+
+    # Build a record from a solve_direct / solve_with_reasoning result dict,
+    # spilling the response text
+    @classmethod
+    def from_result(cls, result, spill):
+        return cls(result["id"], result["question"], result["expected_answer"], result["model_answer"],
+                   spill.write(result["full_response"]), bool(result["is_correct"]), result["hop_count"],
+                   intern_sources(result.get("sources", [])), spill)
+
+    @property
+    def full_response(self):
+        return self.spill.read(self.response_offset)
+
+    def __getitem__(self, key):
+        if key not in FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return self[key] if key in FIELDS else default
+
+    def __contains__(self, key):
+        return key in FIELDS
+
+    # The dict shape written to results/*_results.json
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "question": self.question,
+            "expected_answer": self.expected_answer,
+            "model_answer": self.model_answer,
+            "full_response": self.full_response,
+            "is_correct": self.is_correct,
+            "hop_count": self.hop_count,
+            "sources": list(self.sources)
+        }
+
+# Append-only JSONL checkpoint of finished records. Each line holds a record's
+# scalar fields and the spill offset of its response, and is flushed as soon
+# as the record is graded, so an interrupted run loses at most the question in
+# flight and can be resumed from the log and its spill.
+class RecordLog:
+    def __init__(self, path, spill, resume=False):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.spill = spill
+        self.file = open(path, "a" if resume else "w")
+
+    def append(self, record):
+        self.file.write(json.dumps({
+            "id": record.id,
+            "question": record.question,
+            "expected_answer": record.expected_answer,
+            "model_answer": record.model_answer,
+            "response_offset": record.response_offset,
+            "is_correct": record.is_correct,
+            "hop_count": record.hop_count,
+            "sources": list(record.sources)
+        }) + "\n")
+        self.file.flush()
+
+    # Records logged so far, in log order; a line cut off by a crash is skipped
+    def load(self):
+        records = []
+        try:
+            with open(self.path, "r") as f:
+                for line in f:
+                    try:
+                        item = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    records.append(ResultRecord(item["id"], item["question"], item["expected_answer"],
+                                                item["model_answer"], item["response_offset"], item["is_correct"],
+                                                item["hop_count"], intern_sources(item["sources"]), self.spill))
+        except FileNotFoundError:
+            pass
+        return records
+
+    def close(self):
+        self.file.close()
+
+# Write records (or plain dicts) as a JSON list, one item at a time, producing
+# the same text as json.dump(results, f, indent=2)
+def dump_records(records, path):
+    with open(path, "w") as f:
+        f.write("[")
+        first = True
+        for record in records:
+            item = record.to_dict() if isinstance(record, ResultRecord) else record
+            f.write("\n" if first else ",\n")
+            f.write(textwrap.indent(json.dumps(item, indent=2), "  "))
+            first = False
+        f.write("]" if first else "\n]")
@@ -1,14 +1,21 @@
 import os
-from dotenv import load_dotenv
-import requests
 import json
 import re
 import time
-from tqdm import tqdm
+import argparse
+import statistics
+from collections import Counter
 
-load_dotenv()
+from hop_stats import hop_statistics
+from fact_index import update_fact_index
+from records import ResultRecord, ResponseSpill, RecordLog, dump_records
+# One cached key lookup shared with generation, so .env is read once
+from generation import get_api_key
 
-api_key = os.environ['OPENROUTER_API_KEY']
+MODEL = "google/gemini-2.0-flash-lite-001"
+
+# requests and tqdm are imported inside the functions that call the API, so
+# offline commands (regrade, analysis, benchmarks) never load them
 
 # Function to load the multi-hop questions from your generated files
 def load_questions(sizes=[2, 3, 4, 5]):
@@ -28,26 +35,68 @@ def load_questions(sizes=[2, 3, 4, 5]):
     
     return all_questions
 
-# Function to solve a question with just the answer (no reasoning)
-def solve_direct(question_data, index):
-    question_text = question_data["question"]
-    expected_answer = question_data["answer"]
-    
+# Prompt asking for the bare answer only
+def create_direct_prompt(question_text):
     prompt = f"""You are given a multi-hop reasoning question. Provide ONLY the numerical answer with no explanation.
 Format your response with an XML tag as follows:
 <answer>Your numerical answer here</answer>
 
 Question: "{question_text}"
 """
+    return prompt
+
+# Prompt asking the model to show its work before answering
+def create_reasoning_prompt(question_text):
+    prompt = f"""You are given a multi-hop reasoning question. Solve it step-by-step, showing your full reasoning process.
+
+Question: "{question_text}"
+
+Think through the solution carefully and show all your calculations. Once you've determined the answer, format your response by ending with:
+<answer>Your numerical answer here</answer>
+"""
+    return prompt
+
+# Function to pull the <answer> tag out of a model response (None if missing)
+def extract_answer(model_response):
+    answer_match = re.search(r'<answer>(.*?)</answer>', model_response, re.DOTALL)
+    return answer_match.group(1).strip() if answer_match else None
+
+# Function to extract and check the answer in a model response
+def grade_response(question_data, index, model_response):
+    expected_answer = question_data["answer"]
+    
+    extracted_answer = extract_answer(model_response)
+    
+    # Check if the answer is correct
+    is_correct = str(extracted_answer) == str(expected_answer) if extracted_answer is not None else False
+    
+    return {
+        "id": index,
+        "question": question_data["question"],
+        "expected_answer": expected_answer,
+        "model_answer": extracted_answer,
+        "full_response": model_response,
+        "is_correct": is_correct,
+        "hop_count": question_data["hop_count"],
+        "sources": question_data.get("sources", [])
+    }
+
+# Function to solve a question with just the answer (no reasoning)
+def solve_direct(question_data, index, model=MODEL, create_prompt=create_direct_prompt):
+    import requests
+    question_text = question_data["question"]
+    expected_answer = question_data["answer"]
+    
+    prompt = create_prompt(question_text)
 
     try:
         response = requests.post(
             url="https://openrouter.ai/api/v1/chat/completions",
             headers={
-                "Authorization": f"Bearer {api_key}",
+                "Authorization": f"Bearer {get_api_key()}",
             },
             data=json.dumps({
-                "model": "google/gemini-2.0-flash-lite-001",
+                "model": model,
                 "messages": [
                     {
                         "role": "user",
@@ -61,25 +110,9 @@ Question: "{question_text}"
         model_response = response.json()["choices"][0]["message"]["content"]
         print(model_response)
         
-        # Extract answer using regex
-        answer_match = re.search(r'<answer>(.*?)</answer>', model_response, re.DOTALL)
-        extracted_answer = answer_match.group(1).strip() if answer_match else None
+        result = grade_response(question_data, index, model_response)
         
-        # Check if the answer is correct
-        is_correct = str(extracted_answer) == str(expected_answer) if extracted_answer is not None else False
-        
-        result = {
-            "id": index,
-            "question": question_text,
-            "expected_answer": expected_answer,
-            "model_answer": extracted_answer,
-            "full_response": model_response,
-            "is_correct": is_correct,
-            "hop_count": question_data["hop_count"],
-            "sources": question_data.get("sources", [])
-        }
-        
-        print(f"Direct Q{index} (Hops: {question_data['hop_count']}): {'✓' if is_correct else '✗'}")
+        print(f"Direct Q{index} (Hops: {question_data['hop_count']}): {'✓' if result['is_correct'] else '✗'}")
         return result
         
     except Exception as e:
@@ -96,26 +129,21 @@ Question: "{question_text}"
         }
 
 # Function to solve with reasoning (showing work)
-def solve_with_reasoning(question_data, index):
+def solve_with_reasoning(question_data, index, model=MODEL, create_prompt=create_reasoning_prompt):
+    import requests
     question_text = question_data["question"]
     expected_answer = question_data["answer"]
     
-    prompt = f"""You are given a multi-hop reasoning question. Solve it step-by-step, showing your full reasoning process.
-
-Question: "{question_text}"
-
-Think through the solution carefully and show all your calculations. Once you've determined the answer, format your response by ending with:
-<answer>Your numerical answer here</answer>
-"""
+    prompt = create_prompt(question_text)
 
     try:
         response = requests.post(
             url="https://openrouter.ai/api/v1/chat/completions",
             headers={
-                "Authorization": f"Bearer {api_key}",
+                "Authorization": f"Bearer {get_api_key()}",
             },
             data=json.dumps({
-                "model": "google/gemini-2.0-flash-lite-001",
+                "model": model,
                 "messages": [
                     {
                         "role": "user",
@@ -128,25 +156,9 @@ Think through the solution carefully and show all your calculations. Once you've
         
         model_response = response.json()["choices"][0]["message"]["content"]
         
-        # Extract answer using regex
-        answer_match = re.search(r'<answer>(.*?)</answer>', model_response, re.DOTALL)
-        extracted_answer = answer_match.group(1).strip() if answer_match else None
-        
-        # Check if the answer is correct
-        is_correct = str(extracted_answer) == str(expected_answer) if extracted_answer is not None else False
-        
-        result = {
-            "id": index,
-            "question": question_text,
-            "expected_answer": expected_answer,
-            "model_answer": extracted_answer,
-            "full_response": model_response,
-            "is_correct": is_correct,
-            "hop_count": question_data["hop_count"],
-            "sources": question_data.get("sources", [])
-        }
+        result = grade_response(question_data, index, model_response)
         
-        print(f"Reasoning Q{index} (Hops: {question_data['hop_count']}): {'✓' if is_correct else '✗'}")
+        print(f"Reasoning Q{index} (Hops: {question_data['hop_count']}): {'✓' if result['is_correct'] else '✗'}")
         return result
         
     except Exception as e:
@@ -162,59 +174,204 @@ Think through the solution carefully and show all your calculations. Once you've
             "sources": question_data.get("sources", [])
         }
 
-def main():
-    # Load all questions
-    all_questions = load_questions()
-    print(f"Total questions loaded: {len(all_questions)}")
+# Function to sample k reasoning completions for a question in one request
+# and majority-vote over the extracted answers (self-consistency)
+def solve_self_consistency(question_data, index, k=5, model=MODEL):
+    import requests
+    if k < 1:
+        raise ValueError(f"k must be a positive number of samples, got {k}")
+    question_text = question_data["question"]
+    expected_answer = question_data["answer"]
     
-    # Create results directories
-    os.makedirs("results", exist_ok=True)
+    prompt = create_reasoning_prompt(question_text)
+
+    responses = []
+    try:
+        # Ask for all k samples at once via `n`; some providers ignore `n` and
+        # return a single choice, so top up with extra requests until we have k
+        while len(responses) < k:
+            response = requests.post(
+                url="https://openrouter.ai/api/v1/chat/completions",
+                headers={
+                    "Authorization": f"Bearer {get_api_key()}",
+                },
+                data=json.dumps({
+                    "model": model,
+                    "messages": [
+                        {
+                            "role": "user",
+                            "content": prompt
+                        }
+                    ],
+                    "n": k - len(responses),
+                }),
+                timeout=(30, 180)
+            )
+            
+            choices = response.json()["choices"]
+            if not choices:
+                raise ValueError("No choices returned")
+            # Refusals and filtered outputs come back with null content; keep
+            # them as empty samples, which count as unparseable
+            responses.extend((c.get("message") or {}).get("content") or "" for c in choices[:k - len(responses)])
+            
+            # Add a small delay between top-up requests to avoid rate limiting
+            if len(responses) < k:
+                time.sleep(1)
+    except Exception as e:
+        print(f"Error in self-consistency solve Q{index}: {str(e)}")
+        if not responses:
+            return {
+                "id": index,
+                "question": question_text,
+                "expected_answer": expected_answer,
+                "model_answer": None,
+                "sample_responses": [],
+                "sample_answers": [],
+                "sample_correct": [],
+                "agreement_rate": 0.0,
+                "num_samples": 0,
+                "is_correct": False,
+                "hop_count": question_data["hop_count"],
+                "sources": question_data.get("sources", [])
+            }
     
-    # Solve using direct approach
-    print("\nTesting Direct Answer approach:")
-    direct_results = []
-    for i, q in enumerate(tqdm(all_questions)):
-        result = solve_direct(q, i)
-        direct_results.append(result)
+    # Extract every answer; unparseable samples count against agreement
+    sample_answers = [extract_answer(model_response) for model_response in responses]
+    
+    votes = Counter(a for a in sample_answers if a is not None)
+    if votes:
+        majority_answer, majority_count = votes.most_common(1)[0]
+    else:
+        majority_answer, majority_count = None, 0
+    
+    is_correct = str(majority_answer) == str(expected_answer) if majority_answer is not None else False
+    
+    result = {
+        "id": index,
+        "question": question_text,
+        "expected_answer": expected_answer,
+        "model_answer": majority_answer,
+        # Raw completions, so the vote can be regraded or audited later
+        "sample_responses": responses,
+        "sample_answers": sample_answers,
+        "sample_correct": [a is not None and str(a) == str(expected_answer) for a in sample_answers],
+        "agreement_rate": majority_count / len(sample_answers),
+        "num_samples": len(sample_answers),
+        "is_correct": is_correct,
+        "hop_count": question_data["hop_count"],
+        "sources": question_data.get("sources", [])
+    }
+    
+    print(f"Self-consistency Q{index} (Hops: {question_data['hop_count']}): {'✓' if is_correct else '✗'} (agreement {result['agreement_rate']:.0%})")
+    return result
+
+# Function to summarise self-consistency results by hop count
+def self_consistency_by_hop(results):
+    by_hop = {}
+    for hop_count in sorted(set(r["hop_count"] for r in results)):
+        hop_results = [r for r in results if r["hop_count"] == hop_count]
+        majority_correct = sum(1 for r in hop_results if r["is_correct"])
+        agreements = [r["agreement_rate"] for r in hop_results]
         
-        # Save progress periodically
-        if (i + 1) % 10 == 0 or (i + 1) == len(all_questions):
-            with open("results/direct_results.json", "w") as f:
-                json.dump(direct_results, f, indent=2)
+        # Accuracy of each sample index across the bucket, i.e. k independent
+        # estimates of the single-sample accuracy curve
+        k = max(r["num_samples"] for r in hop_results)
+        sample_accuracies = []
+        for s in range(k):
+            column = [r["sample_correct"][s] for r in hop_results if s < len(r["sample_correct"])]
+            if column:
+                sample_accuracies.append(sum(column) / len(column))
+        
+        by_hop[hop_count] = {
+            "correct": majority_correct,
+            "total": len(hop_results),
+            "majority_accuracy": majority_correct / len(hop_results),
+            "mean_agreement": statistics.mean(agreements),
+            "sample_accuracy_mean": statistics.mean(sample_accuracies) if sample_accuracies else 0,
+            "sample_accuracy_std": statistics.stdev(sample_accuracies) if len(sample_accuracies) > 1 else 0,
+            "num_samples": k
+        }
+    return by_hop
+
+# Function to re-grade saved responses without calling the API again
+def regrade_results():
+    results_by_mode = {}
+    for mode in ["direct", "reasoning"]:
+        filename = f"results/{mode}_results.json"
+        try:
+            with open(filename, "r") as f:
+                results = json.load(f)
+        except FileNotFoundError:
+            print(f"Warning: Could not find {filename}")
+            results_by_mode[mode] = []
+            continue
+        
+        regraded = []
+        changed = 0
+        for r in results:
+            # Failed API calls have nothing to grade
+            if str(r["full_response"]).startswith("Error:"):
+                regraded.append(r)
+                continue
+            
+            question_data = {
+                "question": r["question"],
+                "answer": r["expected_answer"],
+                "hop_count": r["hop_count"],
+                "sources": r.get("sources", [])
+            }
+            result = {**r, **grade_response(question_data, r["id"], r["full_response"])}
+            if result["is_correct"] != r["is_correct"]:
+                changed += 1
+            regraded.append(result)
+        
+        with open(filename, "w") as f:
+            json.dump(regraded, f, indent=2)
+        print(f"Regraded {len(regraded)} {mode} results ({changed} changed)")
+        results_by_mode[mode] = regraded
+    
+    hop_accuracy = compute_hop_accuracy(results_by_mode["direct"], results_by_mode["reasoning"])
+    with open("results/hop_accuracy.json", "w") as f:
+        json.dump(hop_accuracy, f, indent=2)
+    
+    update_fact_index(results_by_mode, MODEL)
     
-    # Calculate direct results accuracy
-    direct_correct = sum(1 for r in direct_results if r["is_correct"])
-    print(f"\nDirect Answer Accuracy: {direct_correct}/{len(direct_results)} = {direct_correct/len(direct_results):.2%}")
+    print_hop_accuracy(hop_accuracy)
+
+def main_self_consistency(k, sizes=[2, 3, 4, 5]):
+    from tqdm import tqdm
+    get_api_key()
     
-    # Save final direct results
-    with open("results/direct_results.json", "w") as f:
-        json.dump(direct_results, f, indent=2)
+    all_questions = load_questions(sizes)
+    print(f"Total questions loaded: {len(all_questions)}")
     
-    # Add a pause to avoid rate limiting
-    print("Pausing for 30 seconds before starting reasoning tests...")
-    time.sleep(30)
+    os.makedirs("results", exist_ok=True)
     
-    # Solve using reasoning approach
-    print("\nTesting Reasoning approach:")
-    reasoning_results = []
+    print(f"\nTesting Self-Consistency approach ({k} samples per question):")
+    sc_results = []
     for i, q in enumerate(tqdm(all_questions)):
-        result = solve_with_reasoning(q, i)
-        reasoning_results.append(result)
+        result = solve_self_consistency(q, i, k)
+        sc_results.append(result)
         
         # Save progress periodically
         if (i + 1) % 10 == 0 or (i + 1) == len(all_questions):
-            with open("results/reasoning_results.json", "w") as f:
-                json.dump(reasoning_results, f, indent=2)
-    
-    # Calculate reasoning results accuracy
-    reasoning_correct = sum(1 for r in reasoning_results if r["is_correct"])
-    print(f"\nReasoning Approach Accuracy: {reasoning_correct}/{len(reasoning_results)} = {reasoning_correct/len(reasoning_results):.2%}")
+            with open("results/self_consistency_results.json", "w") as f:
+                json.dump(sc_results, f, indent=2)
     
-    # Save final reasoning results
-    with open("results/reasoning_results.json", "w") as f:
-        json.dump(reasoning_results, f, indent=2)
+    sc_by_hop = self_consistency_by_hop(sc_results)
+    with open("results/self_consistency_by_hop.json", "w") as f:
+        json.dump(sc_by_hop, f, indent=2)
     
-    # Generate hop-based accuracy report
+    print("\nSelf-Consistency Accuracy by Hop Count:")
+    for hop_count, stats in sc_by_hop.items():
+        print(f"{hop_count}-hop questions:")
+        print(f"  Majority vote:  {stats['correct']}/{stats['total']} = {stats['majority_accuracy']:.2%}")
+        print(f"  Per-sample:     {stats['sample_accuracy_mean']:.2%} ± {stats['sample_accuracy_std']:.2%}")
+        print(f"  Mean agreement: {stats['mean_agreement']:.2%}")
+
+# Function to build the hop-based accuracy report
+def compute_hop_accuracy(direct_results, reasoning_results):
     hop_accuracy = {}
     for hop_count in range(2, 6):
         direct_hop_results = [r for r in direct_results if r["hop_count"] == hop_count]
@@ -238,16 +395,119 @@ def main():
             }
         }
     
-    # Save hop-based accuracy report
-    with open("results/hop_accuracy.json", "w") as f:
-        json.dump(hop_accuracy, f, indent=2)
-    
-    # Print hop-based accuracy report
+    # Attach bootstrap CIs and the paired McNemar comparison for each hop count
+    for hop_count, hop_stats in hop_statistics(direct_results, reasoning_results).items():
+        if hop_count in hop_accuracy:
+            hop_accuracy[hop_count]["direct"].update(hop_stats["direct"])
+            hop_accuracy[hop_count]["reasoning"].update(hop_stats["reasoning"])
+            hop_accuracy[hop_count]["comparison"] = hop_stats["comparison"]
+    return hop_accuracy
+
+# Function to print the hop-based accuracy report
+def print_hop_accuracy(hop_accuracy):
     print("\nAccuracy by Hop Count:")
     for hop_count, stats in hop_accuracy.items():
         print(f"{hop_count}-hop questions:")
         print(f"  Direct:    {stats['direct']['correct']}/{stats['direct']['total']} = {stats['direct']['accuracy']:.2%}")
         print(f"  Reasoning: {stats['reasoning']['correct']}/{stats['reasoning']['total']} = {stats['reasoning']['accuracy']:.2%}")
+        if "comparison" in stats and stats["comparison"]["delta"] is not None:
+            comparison = stats["comparison"]
+            print(f"  Delta:     {comparison['delta']:.2%} [{comparison['delta_ci_low']:.2%}, {comparison['delta_ci_high']:.2%}], McNemar p = {comparison['mcnemar_p_value']:.3g}")
+
+# Function to answer every question in one mode. Each graded record is
+# appended to the mode's checkpoint log as soon as it finishes; with resume,
+# questions already answered in the log (same combo and question text) are
+# reused and only missing or errored ones are asked again.
+def evaluate_phase(all_questions, solve, spill, log, resume=False):
+    from tqdm import tqdm
+    done = {}
+    if resume:
+        for record in log.load():
+            done[(tuple(record.sources), record.question)] = record
+        print(f"Resuming with {len(done)} checkpointed results from {log.path}")
+    
+    results = []
+    for i, q in enumerate(tqdm(all_questions)):
+        record = done.get((tuple(q.get("sources", [])), q["question"]))
+        if record is None or str(record.full_response).startswith("Error:"):
+            record = ResultRecord.from_result(solve(q, i), spill)
+            log.append(record)
+        # Ids follow the current question order, as in a fresh run
+        record.id = i
+        results.append(record)
+    return results
+
+def main(sizes=[2, 3, 4, 5], resume=False):
+    # Fail before any work if the key is missing
+    get_api_key()
+    
+    # Load all questions
+    all_questions = load_questions(sizes)
+    print(f"Total questions loaded: {len(all_questions)}")
+    
+    # Create results directories
+    os.makedirs("results", exist_ok=True)
+    
+    # Keep compact records in memory with response text in spill files; the
+    # checkpoint logs persist progress, so the results JSON is written once
+    # at the end of each phase
+    direct_spill = ResponseSpill("results/direct_responses.jsonl", resume)
+    reasoning_spill = ResponseSpill("results/reasoning_responses.jsonl", resume)
+    direct_log = RecordLog("results/direct_checkpoint.jsonl", direct_spill, resume)
+    reasoning_log = RecordLog("results/reasoning_checkpoint.jsonl", reasoning_spill, resume)
+    try:
+        # Solve using direct approach
+        print("\nTesting Direct Answer approach:")
+        direct_results = evaluate_phase(all_questions, solve_direct, direct_spill, direct_log, resume)
+        
+        # Calculate direct results accuracy
+        direct_correct = sum(1 for r in direct_results if r["is_correct"])
+        print(f"\nDirect Answer Accuracy: {direct_correct}/{len(direct_results)} = {direct_correct/len(direct_results):.2%}")
+        
+        # Save final direct results
+        dump_records(direct_results, "results/direct_results.json")
+        
+        # Add a pause to avoid rate limiting
+        print("Pausing for 30 seconds before starting reasoning tests...")
+        time.sleep(30)
+        
+        # Solve using reasoning approach
+        print("\nTesting Reasoning approach:")
+        reasoning_results = evaluate_phase(all_questions, solve_with_reasoning, reasoning_spill, reasoning_log, resume)
+        
+        # Calculate reasoning results accuracy
+        reasoning_correct = sum(1 for r in reasoning_results if r["is_correct"])
+        print(f"\nReasoning Approach Accuracy: {reasoning_correct}/{len(reasoning_results)} = {reasoning_correct/len(reasoning_results):.2%}")
+        
+        # Save final reasoning results
+        dump_records(reasoning_results, "results/reasoning_results.json")
+        
+        # Generate hop-based accuracy report
+        hop_accuracy = compute_hop_accuracy(direct_results, reasoning_results)
+        
+        # Save hop-based accuracy report
+        with open("results/hop_accuracy.json", "w") as f:
+            json.dump(hop_accuracy, f, indent=2)
+        
+        # Index results by source fact for per-fact error attribution
+        update_fact_index({"direct": direct_results, "reasoning": reasoning_results}, MODEL)
+    finally:
+        for closable in [direct_log, reasoning_log, direct_spill, reasoning_spill]:
+            closable.close()
+    
+    # Print hop-based accuracy report
+    print_hop_accuracy(hop_accuracy)
 
 if __name__ == "__main__":
-    main()
+    from multihop import positive_int
+    parser = argparse.ArgumentParser(description="Evaluate multi-hop questions")
+    parser.add_argument("--self-consistency", type=positive_int, metavar="K",
+                        help="sample K reasoning completions per question and majority-vote")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted run from the results/*_checkpoint.jsonl logs")
+    args = parser.parse_args()
+    
+    if args.self_consistency is not None:
+        main_self_consistency(args.self_consistency)
+    else:
+        main(resume=args.resume)